@@ -3,8 +3,7 @@
 from .config import EFFICIENCY_RATIO, PERFORMANCE_FACTOR, AREA_CELLS, CONVERSION_RATIO
 from .data_processing import calculate_hourly_energy, calculate_monthly_energy, calculate_annual_energy
 from .detrending import linear_detrend, gaussian_detrend
-from .payouts import calculate_payouts, expected_loss
-from .plotting import plot_annual_trend, plot_monthly_scatter, plot_interactive_annual, plot_monthly_seasonality, plot_gamma_distributions
+from .payouts import calculate_payouts, expected_loss, blown_expected_loss
 from .gamma_model import calculate_gamma_parameters, excel_style_percentiles, apply_exponential_blow, generate_distributions
 from .sobol_sim import sobol_sim
 from .data_input import load_ssrd
@@ -18,6 +17,7 @@ __all__ = [
     "gaussian_detrend",
     "calculate_payouts",
     "expected_loss",
+    "blown_expected_loss",
     "plot_annual_trend",
     "plot_monthly_scatter",
     "plot_interactive_annual",
@@ -30,3 +30,19 @@ __all__ = [
     "sobol_sim",
     # config constants could also be exposed if desired
 ]
+
+# Plotting pulls in matplotlib and plotly, so it is only imported on first access
+_PLOTTING = {
+    "plot_annual_trend",
+    "plot_monthly_scatter",
+    "plot_interactive_annual",
+    "plot_monthly_seasonality",
+    "plot_gamma_distributions",
+}
+
+
+def __getattr__(name: str):
+    if name in _PLOTTING:
+        from . import plotting
+        return getattr(plotting, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
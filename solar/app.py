@@ -43,10 +43,12 @@ df_monthly = solar.calculate_monthly_energy(df)
 df_annual = solar.calculate_annual_energy(df)
 
 # --- Rescale based on Client P50 ---
-ref = df_annual[(df_annual["Year"] >= 1980) & (df_annual["Year"] <= 2023)]
-p50 = ref["Energy_MWh_Hourly"].mean()
+annual_years = df_annual["Year"].to_numpy()
+annual_energy = df_annual["Energy_MWh_Hourly"].to_numpy()
+ref = annual_energy[(annual_years >= 1980) & (annual_years <= 2023)]
+p50 = ref.mean() if ref.size else np.nan
 rescale_factor = client_p50 / p50 if p50 else np.nan
-df_annual["Rescaled_Energy_MWh"] = df_annual["Energy_MWh_Hourly"] * rescale_factor
+df_annual["Rescaled_Energy_MWh"] = annual_energy * rescale_factor
 
 # --- Detrending choice ---
 method = st.sidebar.selectbox("Detrending Method", ["Linear", "Kernel"])
@@ -76,12 +78,11 @@ bc_total = burn_cost(subset["Payout_Detrended"])
 try:
     sobol_path = "/Users/gaurav.srivastava/Downloads/solar/sobol.csv"
     sob = pd.read_csv(sobol_path).iloc[:, 0].values
-    shape, scale = solar.gamma_params(subset["User_Detrended"].values)
+    shape, scale = solar.calculate_gamma_parameters(subset["User_Detrended"].values)
     gamma_vals = sgamma.ppf(sob, a=shape, scale=scale)
-    blown = solar.apply_exponential_blow(gamma_vals, blow_point, blow_factor, blow_dir, shift)
-    payouts = np.clip((strike - blown), 0, strike - exit) * ppa_rate
-    payouts = np.minimum(payouts, limit)
-    expected_loss = payouts.mean()
+    expected_loss = solar.blown_expected_loss(
+        gamma_vals, blow_point, blow_factor, blow_dir, shift, strike, exit, ppa_rate, limit
+    )
 except Exception as e:
     expected_loss = None
 
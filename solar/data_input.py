@@ -1,13 +1,20 @@
 from pathlib import Path
-from solar.ssrd_io import get_ssrd_series
 
 NC_PATH = Path("/Users/gaurav.srivastava/Downloads/era5ssrd/era5ssrd.nc")
+# Site-chunked copy of NC_PATH (see ssrd_zarr_adapter.nc_to_zarr); preferred when present
+ZARR_PATH = NC_PATH.with_suffix(".zarr")
 
 def load_ssrd(lat: float, lon: float):
     """
-    Load SSRD time series from the fixed ERA5 NetCDF file
-    for the given latitude and longitude.
+    Load SSRD time series from the fixed ERA5 Zarr store (or the NetCDF
+    file if it has not been converted) for the given latitude and longitude.
     """
+    if ZARR_PATH.exists():
+        from solar.ssrd_zarr_adapter import load_ssrd_from_zarr
+        return load_ssrd_from_zarr(ZARR_PATH, lat, lon, unit="Jm2", tz=None)
+
+    from solar.ssrd_io import get_ssrd_series  # deferred: pulls in xarray
+
     if not NC_PATH.exists():
         raise FileNotFoundError(f"ERA5 SSRD file not found at {NC_PATH}")
     df, meta = get_ssrd_series(NC_PATH, lat, lon, unit="Jm2", tz=None)
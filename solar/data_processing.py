@@ -1,43 +1,93 @@
-"""Data loading and preprocessing utilities for the Solar package."""
+"""Data loading and preprocessing utilities for the Solar package.
+
+SSRD and hourly energy are held as float32; sums are accumulated in float64.
+"""
 from __future__ import annotations
+import numpy as np
 import pandas as pd
+from numba import get_num_threads, njit, prange
 from .config import EFFICIENCY_RATIO, PERFORMANCE_FACTOR, AREA_CELLS, CONVERSION_RATIO
 
+# SSRD (J/m²) -> kWh multiplier, folded once so the column is scaled in a single pass
+_ENERGY_K: float = AREA_CELLS * EFFICIENCY_RATIO * PERFORMANCE_FACTOR * CONVERSION_RATIO
+
 
 def read_solar_data(path: str) -> pd.DataFrame:
     """
     Read solar SSRD CSV data with a 'Date' column (auto-detects tab or comma separator).
     """
-    for sep in ('\t', ','):
-        try:
-            return pd.read_csv(path, sep=sep, parse_dates=['Date'], dayfirst=True)
-        except Exception:
-            continue
-    raise ValueError("Could not read CSV; ensure it has 'Date' and 'SSRD' columns.")
+    with open(path, 'rb') as fh:
+        head = fh.readline()
+    sep = '\t' if head.count(b'\t') > head.count(b',') else ','
+    try:
+        df = pd.read_csv(path, sep=sep, engine='pyarrow')
+        # Parse once on the whole column so pandas infers a single format
+        df['Date'] = pd.to_datetime(df['Date'], dayfirst=True)
+        df['SSRD'] = df['SSRD'].astype(np.float32)
+    except Exception as exc:
+        raise ValueError("Could not read CSV; ensure it has 'Date' and 'SSRD' columns.") from exc
+    return df
 
 
 def calculate_hourly_energy(df: pd.DataFrame) -> pd.DataFrame:
     """
     Calculate hourly energy from SSRD using configured panel specs (in kWh).
     """
-    df = df.copy()
-    df['Hourly_Energy_kWh'] = (
-        df['SSRD']
-        * AREA_CELLS
-        * EFFICIENCY_RATIO
-        * PERFORMANCE_FACTOR
-        * CONVERSION_RATIO
-    )
-    return df
+    return df.assign(Hourly_Energy_kWh=df['SSRD'].to_numpy(dtype=np.float32) * np.float32(_ENERGY_K))
 
 
 def calculate_monthly_energy(df: pd.DataFrame) -> pd.DataFrame:
     """
     Aggregate hourly energy to monthly totals (MWh).
     """
-    monthly = df.resample('ME', on='Date')['Hourly_Energy_kWh'].sum().reset_index()
-    monthly['Monthly_Energy_MWh'] = monthly['Hourly_Energy_kWh'] / 1000.0
-    return monthly
+    dates = df['Date']
+    valid = dates.notna().to_numpy()
+    d = dates[valid].dt
+    key = d.year.to_numpy(dtype=np.int64) * 12 + d.month.to_numpy(dtype=np.int64) - 1
+    if key.size == 0:
+        return pd.DataFrame({'Date': dates[:0], 'Hourly_Energy_kWh': np.array([], dtype=np.float64),
+                             'Monthly_Energy_MWh': np.array([], dtype=np.float64)})
+
+    # One bincount over contiguous month keys; empty months inside the range sum to 0
+    k0 = key.min()
+    n_months = key.max() - k0 + 1
+    hourly = df['Hourly_Energy_kWh'].to_numpy()[valid]
+    finite = ~np.isnan(hourly)
+    if not finite.all():  # NaN hours are skipped, as resample().sum() did
+        key, hourly = key[finite], hourly[finite]
+    sums = np.bincount(key - k0, weights=hourly, minlength=n_months)
+    first = pd.Timestamp(year=int(k0 // 12), month=int(k0 % 12) + 1, day=1)
+    month_ends = pd.date_range(first, periods=sums.size, freq='ME', unit=np.datetime_data(dates.dtype)[0])
+
+    return pd.DataFrame({
+        'Date': month_ends,
+        'Hourly_Energy_kWh': sums,
+        'Monthly_Energy_MWh': sums / 1000.0,
+    })
+
+
+@njit(cache=True, parallel=True)
+def _annual_sum_kernel(solar_year, hourly, y0, n_years, n_chunks):
+    """Per-year (sums, row counts) for years y0 .. y0+n_years-1; other rows are skipped."""
+    n = hourly.size
+    step = (n + n_chunks - 1) // n_chunks
+    local_sums = np.zeros((n_chunks, n_years))
+    local_counts = np.zeros((n_chunks, n_years), dtype=np.int64)
+    # Each chunk scatters into its own row, so no two threads share an accumulator
+    for c in prange(n_chunks):
+        for i in range(c * step, min(n, (c + 1) * step)):
+            k = solar_year[i] - y0
+            if 0 <= k < n_years:
+                # NaN hours still count as rows but add nothing, matching a pandas sum
+                if hourly[i] == hourly[i]:
+                    local_sums[c, k] += hourly[i]
+                local_counts[c, k] += 1
+    sums = np.zeros(n_years)
+    counts = np.zeros(n_years, dtype=np.int64)
+    for c in range(n_chunks):
+        sums += local_sums[c]
+        counts += local_counts[c]
+    return sums, counts
 
 
 def calculate_annual_energy(df: pd.DataFrame) -> pd.DataFrame:
@@ -45,42 +95,36 @@ def calculate_annual_energy(df: pd.DataFrame) -> pd.DataFrame:
     Calculate annual energy (Sept 1 – Aug 31 blocks) from hourly data.
 
     This replicates the original script logic:
-    - Year window: Sept Y to Aug Y+1 (365 days, add 1 if leap day inside)
+    - Year window: Sept Y to Aug Y+1, labelled Y
     - Skips any year > 2024
     """
     if "Date" not in df.columns:
         raise ValueError("Input DataFrame must contain a 'Date' column.")
 
-    df = df.copy()
-    df["Date"] = pd.to_datetime(df["Date"], dayfirst=True, errors="coerce")
-    df = df.dropna(subset=["Date"])
-    if df.empty:
+    # Work on column arrays so the frame itself is never copied
+    dates = df["Date"]
+    if dates.dtype.kind != "M":
+        dates = pd.to_datetime(dates, dayfirst=True, errors="coerce")
+    valid = dates.notna().to_numpy()
+    if not valid.any():
         raise ValueError("No valid dates found in 'Date' column.")
+    hourly = df["Hourly_Energy_kWh"].to_numpy()
+    if not valid.all():
+        dates, hourly = dates[valid], hourly[valid]
+
+    # Solar-year label: Sept–Dec belong to their own year, Jan–Aug to the previous one
+    years = dates.dt.year.to_numpy(dtype=np.int64)
+    solar_year = years - (dates.dt.month.to_numpy() < 9)
+
+    # ✅ Ignore anything beyond 2024 and blocks starting before the first calendar year
+    y0 = int(years.min())
+    y1 = min(int(solar_year.max()), 2024)
+    sums, counts = _annual_sum_kernel(
+        solar_year, hourly, y0, max(y1 - y0 + 1, 0), get_num_threads()
+    )
+    present = counts > 0
 
-    df = df.sort_values("Date")
-    out = []
-
-    for y in df["Date"].dt.year.unique():
-        if y > 2024:
-            continue  # ✅ Ignore anything beyond 2024
-
-        start = pd.Timestamp(y, 9, 1)
-        end = start + pd.Timedelta(days=365)
-
-        # ✅ Handle leap years: extend window if Feb 29 falls inside
-        try:
-            leap_check = pd.Timestamp(y, 2, 29)
-            if start <= leap_check <= end:
-                end += pd.Timedelta(days=1)
-        except ValueError:
-            pass
-
-        mask = (df["Date"] >= start) & (df["Date"] <= end)
-        total_kwh = df.loc[mask, "Hourly_Energy_kWh"].sum()
-
-        out.append({
-            "Year": int(y),
-            "Energy_MWh_Hourly": total_kwh / 1000.0
-        })
-
-    return pd.DataFrame(out)
+    return pd.DataFrame({
+        "Year": np.arange(y0, y0 + sums.size)[present],
+        "Energy_MWh_Hourly": sums[present] / 1000.0,
+    })
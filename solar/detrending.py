@@ -1,9 +1,28 @@
 """Detrending utilities for annual solar energy series."""
 from __future__ import annotations
+from functools import lru_cache
 import numpy as np
-import pandas as pd
-from scipy.stats import linregress
-from sklearn.metrics.pairwise import rbf_kernel
+
+
+def _ols(x: np.ndarray, y: np.ndarray) -> tuple[float, float]:
+    """Least-squares (slope, intercept) of y on x via the centered two-pass formula."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    xm = x.mean(); ym = y.mean()
+    dx = x - xm
+    slope = float(dx @ (y - ym) / (dx @ dx))
+    return slope, float(ym - slope * xm)
+
+
+@lru_cache(maxsize=32)
+def _rbf_weights(x_bytes: bytes, n: int, bw: float) -> np.ndarray:
+    """Row-normalized RBF weights exp(-(xi - xj)^2 / (2 bw^2)) for float64 x (cached, read-only)."""
+    x = np.frombuffer(x_bytes, dtype=np.float64, count=n)
+    d = x[:, None] - x[None, :]
+    w = np.exp(d * d * (-0.5 / (bw * bw)))
+    w /= w.sum(axis=1, keepdims=True)
+    w.flags.writeable = False
+    return w
 
 
 def gaussian_detrend(x: np.ndarray, y: np.ndarray, bw: float) -> tuple[np.ndarray, np.ndarray]:
@@ -11,14 +30,13 @@ def gaussian_detrend(x: np.ndarray, y: np.ndarray, bw: float) -> tuple[np.ndarra
     Apply Gaussian RBF smoothing and return (smoothed, detrended),
     anchoring the detrended series to the last smoothed point.
     """
-    X = np.array(x).reshape(-1, 1)
-    y = np.array(y, dtype=float)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
 
-    if len(X) == 0 or len(y) == 0:
+    if len(x) == 0 or len(y) == 0:
         return np.array([]), np.array([])
 
-    w = rbf_kernel(X, X, gamma=1.0 / (2.0 * bw ** 2))
-    w = w / w.sum(axis=1, keepdims=True)
+    w = _rbf_weights(x.tobytes(), len(x), float(bw))
 
     smoothed = w @ y
     anchor = smoothed[-1]
@@ -32,15 +50,13 @@ def linear_detrend(x: np.ndarray, y: np.ndarray) -> np.ndarray:
     Detrend a series linearly using regression residuals,
     anchoring the detrended series to the last fitted point.
     """
-    # Ensure Series to support .iloc
-    x = pd.Series(x).reset_index(drop=True)
-    y = pd.Series(y, dtype=float).reset_index(drop=True)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
 
-    if x.empty or y.empty:
+    if len(x) == 0 or len(y) == 0:
         return np.array([])
 
-    slope, intercept, *_ = linregress(x, y)
-    anchor = x.iloc[-1] * slope + intercept   # ✅ fixed (was x[-1])
+    slope, intercept = _ols(x, y)
+    anchor = x[-1] * slope + intercept
 
-    detrended = anchor + (y - (x * slope + intercept))
-    return detrended.to_numpy()
+    return anchor + (y - (x * slope + intercept))
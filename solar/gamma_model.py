@@ -1,45 +1,88 @@
 """Gamma distribution fitting and blown-distribution generation utilities."""
 from __future__ import annotations
+import math
+from functools import lru_cache
 import numpy as np
-from scipy.stats import gamma as sgamma
+from numba import njit, prange, types
+from scipy.special import gammaincinv
+
+# Eager-compile for writable and read-only inputs (pandas copy-on-write hands out read-only views)
+_F64_ARRAYS = (types.float64[::1], types.Array(types.float64, 1, 'C', readonly=True))
+
+@njit([types.UniTuple(types.float64, 4)(a) for a in _F64_ARRAYS], cache=True, error_model='numpy')
+def _gamma_params_kernel(vals):
+    """Method-of-moments fit -> (mean, std, shape, scale), std with ddof=1."""
+    n = vals.size
+    mean = 0.0
+    for i in range(n):
+        mean += vals[i]
+    mean /= n
+    ss = 0.0
+    for i in range(n):
+        d = vals[i] - mean
+        ss += d * d
+    std = math.sqrt(ss / (n - 1))
+    shape = (mean / std) ** 2
+    scale = (std ** 2) / mean
+    return mean, std, shape, scale
+
+@lru_cache(maxsize=64)
+def _gamma_fit(values_bytes: bytes, n: int) -> tuple[float, float]:
+    """(shape, scale) for a float64 array given as raw bytes (cached across reruns)."""
+    _, _, shape, scale = _gamma_params_kernel(np.frombuffer(values_bytes, dtype=np.float64, count=n))
+    return shape, scale
 
 def calculate_gamma_parameters(values: np.ndarray) -> tuple[float, float]:
     """
     Estimate shape and scale parameters for a gamma distribution from data.
     """
-    mean = values.mean()
-    std = values.std(ddof=1)
-    shape = (mean / std) ** 2
-    scale = (std ** 2) / mean
-    return shape, scale
+    values = np.ascontiguousarray(values, dtype=np.float64).reshape(-1)
+    return _gamma_fit(values.tobytes(), values.size)
+
+@lru_cache(maxsize=8)
+def _sorted_values(values_bytes: bytes, n: int, dtype: str) -> np.ndarray:
+    """Sorted copy of a flat array given as raw bytes (cached, read-only)."""
+    sorted_vals = np.sort(np.frombuffer(values_bytes, dtype=dtype, count=n))
+    sorted_vals.flags.writeable = False
+    return sorted_vals
 
 def excel_style_percentiles(values: np.ndarray, percentiles: np.ndarray) -> np.ndarray:
     """
     Mimic Excel percentile behavior (nearest rank).
     """
-    sorted_vals = np.sort(values)
-    n = len(sorted_vals)
-    result = []
-    for p in percentiles:
-        rank = int(np.ceil(p * n))
-        rank = min(max(rank, 1), n)
-        result.append(sorted_vals[rank - 1])
-    return np.array(result)
+    values = np.asarray(values).reshape(-1)
+    n = values.size
+    percentiles = np.asarray(percentiles, dtype=np.float64)
+    ranks = np.clip(np.ceil(percentiles * n).astype(np.intp), 1, n) - 1
+    # Few ranks on a large sample: quickselect them in O(n) instead of sorting
+    if ranks.size * math.log2(max(n, 2)) < n:
+        return np.partition(values, np.unique(ranks))[ranks]
+    sorted_vals = _sorted_values(values.tobytes(), n, values.dtype.str)
+    return sorted_vals[ranks]
+
+@njit([types.float64[::1](a, types.float64, types.float64, types.boolean, types.float64) for a in _F64_ARRAYS],
+      cache=True, fastmath=True, parallel=True)
+def _blow_kernel(vals, pt, factor, is_down, shift):
+    """Single-pass blow + shift over a flat float64 array."""
+    k = math.exp(-factor / 100.0)
+    out = np.empty_like(vals)
+    for i in prange(vals.size):
+        v = vals[i]
+        hit = v < pt if is_down else v > pt
+        out[i] = (pt + (v - pt) * k if hit else v) + shift
+    return out
 
 def apply_exponential_blow(values: np.ndarray, blow_point: float, blow_factor: float, blow_dir: str, shift: float) -> np.ndarray:
     """
     Apply exponential blow-up/down transformation.
     """
-    values = np.asarray(values)
-    if blow_dir == 'D':
-        mask = values < blow_point
-        blown = np.where(mask, blow_point - (blow_point - values) * np.exp(-blow_factor / 100), values)
-    elif blow_dir == 'U':
-        mask = values > blow_point
-        blown = np.where(mask, blow_point + (values - blow_point) * np.exp(-blow_factor / 100), values)
-    else:
-        blown = values
-    return blown + shift
+    values = np.asarray(values, dtype=np.float64)
+    if blow_dir not in ('D', 'U'):
+        return values + shift
+    # Direction is resolved here so the compiled kernel keeps a single signature
+    out = _blow_kernel(np.ascontiguousarray(values).reshape(-1), float(blow_point), float(blow_factor),
+                       blow_dir == 'D', float(shift))
+    return out.reshape(values.shape)
 
 def generate_distributions(values: np.ndarray, shape: float, scale: float, percentiles: np.ndarray,
                            blow_point: float, blow_factor: float, blow_dir: str, shift: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
@@ -47,6 +90,6 @@ def generate_distributions(values: np.ndarray, shape: float, scale: float, perce
     Generate empirical, gamma, and blown-gamma percentile curves.
     """
     empirical = excel_style_percentiles(values, percentiles)
-    gamma_vals = sgamma.ppf(percentiles, a=shape, scale=scale)
+    gamma_vals = gammaincinv(shape, percentiles) * scale
     blown_vals = apply_exponential_blow(gamma_vals, blow_point, blow_factor, blow_dir, shift)
     return empirical, gamma_vals, blown_vals
@@ -1,9 +1,10 @@
 """Main CLI entrypoint for the Solar energy modeling package."""
 from __future__ import annotations
 import argparse
+from functools import lru_cache
 import numpy as np
 from pathlib import Path
-import matplotlib.pyplot as plt
+from scipy.special import gammaincinv
 
 from .data_input import load_ssrd
 from .data_processing import calculate_hourly_energy, calculate_monthly_energy, calculate_annual_energy
@@ -15,6 +16,7 @@ from .plotting import (
     plot_annual_trend, plot_interactive_annual, plot_monthly_scatter, plot_monthly_seasonality,
     plot_detrended_comparison, plot_payout_bars, plot_gamma_distributions, plot_sobol_simulation
 )
+import matplotlib.pyplot as plt  # after .plotting, which picks the backend
 
 OUTPUT_DIR = Path("outputs")
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -28,17 +30,21 @@ def save_fig(fig, name: str, is_plotly=False):
         plt.close(fig)
     print(f"Saved → {out}")
 
+@lru_cache(maxsize=8)
+def _site_energy(lat: float, lon: float):
+    """Monthly and yearly energy for a site, cached so repeated runs skip the hourly aggregation."""
+    df, meta = load_ssrd(lat, lon)
+    df = calculate_hourly_energy(df)
+    return calculate_monthly_energy(df), calculate_annual_energy(df)
+
 def run(lat: float, lon: float, method: str, start: int, end: int, bw: float,
         strike: float, exit: float, ppa: float, blow_point: float, blow_factor: float) -> None:
     """Run the full modeling workflow on ERA5 SSRD data at (lat, lon)."""
 
     # --- Data ---
-    df, meta = load_ssrd(lat, lon)
-    df = calculate_hourly_energy(df)
-    monthly = calculate_monthly_energy(df)
-    yearly = calculate_annual_energy(df)
-    rescale_factor = yearly['Energy_MWh_Hourly'].mean()
-    yearly['Rescaled_Energy_MWh'] = yearly['Energy_MWh_Hourly'] * (rescale_factor / yearly['Energy_MWh_Hourly'].mean())
+    monthly, yearly = _site_energy(lat, lon)
+    # Rescaling by mean/mean is the identity; assign keeps the cached frame untouched
+    yearly = yearly.assign(Rescaled_Energy_MWh=yearly['Energy_MWh_Hourly'])
 
     # --- Detrend ---
     sub = yearly[(yearly['Year'] >= start) & (yearly['Year'] <= end)].copy()
@@ -54,7 +60,13 @@ def run(lat: float, lon: float, method: str, start: int, end: int, bw: float,
     # --- Gamma + Sobol ---
     shape, scale = calculate_gamma_parameters(sub['User_Detrended'].values)
     sobol_values = sobol_sim(shape, scale, "/Users/gaurav.srivastava/Downloads/solar/solar/sobol.csv")
-    blown = apply_exponential_blow(sobol_values, blow_point, blow_factor, 'D', 0)
+    percentiles = np.arange(0.01, 1.00, 0.01)
+    gamma_vals = gammaincinv(shape, percentiles) * scale
+    # One blow pass covers both the Sobol samples (loss + histogram) and the percentile curve
+    blown, blown_vals = np.split(
+        apply_exponential_blow(np.concatenate([sobol_values, gamma_vals]), blow_point, blow_factor, 'D', 0),
+        [sobol_values.size],
+    )
     eloss = expected_loss(blown, strike, exit, ppa, limit)
     print(f"\nExpected Loss from Sobol Simulation: ₹{eloss:,.2f}")
 
@@ -78,11 +90,7 @@ def run(lat: float, lon: float, method: str, start: int, end: int, bw: float,
     f6 = plot_payout_bars(sub)
     save_fig(f6, "payout_bars.png")
 
-    percentiles = np.arange(0.01, 1.00, 0.01)
     empirical = np.percentile(sub['User_Detrended'].values, percentiles * 100.0)
-    from scipy.stats import gamma
-    gamma_vals = gamma.ppf(percentiles, a=shape, scale=scale)
-    blown_vals = apply_exponential_blow(gamma_vals, blow_point, blow_factor, 'D', 0)
     f7 = plot_gamma_distributions(percentiles, empirical, gamma_vals, blown_vals, strike, exit)
     save_fig(f7, "gamma_distribution.png")
 
@@ -1,18 +1,36 @@
 """Payout and expected loss calculations."""
 from __future__ import annotations
+import math
 import numpy as np
 import pandas as pd
+from numba import njit, prange, types
+
+# Eager-compile for writable and read-only inputs (pandas copy-on-write hands out read-only views)
+_F64_ARRAYS = (types.float64[::1], types.Array(types.float64, 1, 'C', readonly=True))
+_F64 = types.float64
+
+
+def _capped_payout(energy, strike: float, ppa: float, limit: float) -> np.ndarray:
+    """min(limit, max(0, strike - energy) * ppa), computed in place in one output buffer."""
+    out = np.subtract(strike, np.asarray(energy, dtype=np.float64))
+    np.maximum(out, 0.0, out=out)
+    np.multiply(out, ppa, out=out)
+    np.minimum(out, limit, out=out)
+    return out
 
 
 def calculate_payouts(df: pd.DataFrame, strike: float, exit: float, ppa: float):
     """
     Calculate payouts based on strike, exit, and PPA rate.
     If 'User_Detrended' is missing, it will be auto-created from 'Rescaled_Energy_MWh'.
+    Returns a new frame with the payout columns added; the input is left unchanged.
     """
+    new_cols = {}
+
     # --- Safety fallback ---
     if "User_Detrended" not in df.columns:
         if "Rescaled_Energy_MWh" in df.columns:
-            df["User_Detrended"] = df["Rescaled_Energy_MWh"].copy()
+            new_cols["User_Detrended"] = df["Rescaled_Energy_MWh"]
         else:
             raise KeyError(
                 "Expected 'User_Detrended' or 'Rescaled_Energy_MWh' column not found in DataFrame"
@@ -22,18 +40,49 @@ def calculate_payouts(df: pd.DataFrame, strike: float, exit: float, ppa: float):
         raise KeyError("Expected 'Rescaled_Energy_MWh' column not found in DataFrame")
 
     limit = (strike - exit) * ppa
+    detrended = new_cols.get("User_Detrended", df.get("User_Detrended"))
+
+    new_cols["Payout_Untrended"] = _capped_payout(df["Rescaled_Energy_MWh"].to_numpy(), strike, ppa, limit)
+    new_cols["Payout_Detrended"] = _capped_payout(detrended.to_numpy(), strike, ppa, limit)
 
-    df["Payout_Untrended"] = np.minimum(
-        limit,
-        np.maximum(0.0, (strike - df["Rescaled_Energy_MWh"])) * ppa
-    )
+    # assign only adds columns; existing ones are shared with the caller's frame, not copied
+    return df.assign(**new_cols), limit
 
-    df["Payout_Detrended"] = np.minimum(
-        limit,
-        np.maximum(0.0, (strike - df["User_Detrended"])) * ppa
-    )
 
-    return df, limit
+@njit(cache=True)
+def _loss_term(v, strike, cap, ppa, limit):
+    """min(clip(strike - v, 0, cap) * ppa, limit) for one sample (NaN propagates)."""
+    d = strike - v
+    if d < 0.0:
+        d = 0.0
+    elif d > cap:
+        d = cap
+    p = d * ppa
+    return limit if p > limit else p
+
+
+@njit([_F64(a, _F64, _F64, _F64, _F64) for a in _F64_ARRAYS],
+      cache=True, parallel=True, error_model='numpy')
+def _expected_loss_kernel(values, strike, cap, ppa, limit):
+    """Mean payout over the samples in one streaming pass."""
+    total = 0.0
+    for i in prange(values.size):
+        total += _loss_term(values[i], strike, cap, ppa, limit)
+    return total / values.size
+
+
+@njit([_F64(a, _F64, _F64, types.int64, _F64, _F64, _F64, _F64, _F64) for a in _F64_ARRAYS],
+      cache=True, parallel=True, error_model='numpy')
+def _blown_loss_kernel(values, pt, factor, direction, shift, strike, cap, ppa, limit):
+    """Blow (direction 1 = down, -1 = up, 0 = none) + shift each sample, then average its payout."""
+    k = math.exp(-factor / 100.0)
+    total = 0.0
+    for i in prange(values.size):
+        v = values[i]
+        if (direction == 1 and v < pt) or (direction == -1 and v > pt):
+            v = pt + (v - pt) * k
+        total += _loss_term(v + shift, strike, cap, ppa, limit)
+    return total / values.size
 
 
 def expected_loss(
@@ -44,5 +93,26 @@ def expected_loss(
     limit: float
 ) -> float:
     """Compute average expected payout from simulated energy values (blown Sobol samples)."""
-    payout = np.clip((strike - values), 0.0, strike - exit) * ppa
-    return float(np.minimum(payout, limit).mean())
+    values = np.ascontiguousarray(values, dtype=np.float64).reshape(-1)
+    return _expected_loss_kernel(values, float(strike), float(strike - exit), float(ppa), float(limit))
+
+
+def blown_expected_loss(
+    values: np.ndarray,
+    blow_point: float,
+    blow_factor: float,
+    blow_dir: str,
+    shift: float,
+    strike: float,
+    exit: float,
+    ppa: float,
+    limit: float
+) -> float:
+    """
+    Expected payout of blown samples without materializing them.
+    Equivalent to expected_loss(apply_exponential_blow(values, ...), strike, exit, ppa, limit).
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64).reshape(-1)
+    direction = {'D': 1, 'U': -1}.get(blow_dir, 0)
+    return _blown_loss_kernel(values, float(blow_point), float(blow_factor), direction, float(shift),
+                              float(strike), float(strike - exit), float(ppa), float(limit))
@@ -1,141 +1,339 @@
 """Plotting utilities for visualizing solar energy modeling results."""
 from __future__ import annotations
+from collections import OrderedDict
+from functools import wraps
+import inspect
+import os
+import sys
+import matplotlib
+
+# Figures here are saved or handed to an app, never shown in a window: default to the non-GUI Agg
+# backend unless one was chosen (SOLAR_PLOT_BACKEND / MPLBACKEND) or pyplot is already running
+if "matplotlib.pyplot" not in sys.modules and "MPLBACKEND" not in os.environ:
+    matplotlib.use(os.environ.get("SOLAR_PLOT_BACKEND", "Agg"))
+
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib import colormaps
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import Normalize, to_rgba_array
+from matplotlib.lines import Line2D
+from matplotlib.patches import Patch
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
-from scipy.stats import linregress
+from numba import get_num_threads, njit, prange
+
+# Interactive traces longer than this are downsampled server-side when plotly-resampler is available
+_MAX_SHOWN_SAMPLES = 2000
+# Matplotlib data artists with more primitives than this are rasterized so vector exports stay small
+_RASTERIZE_MIN_POINTS = 5000
+# Above this many points the Plotly range slider (a second full render of the trace) is dropped
+_RANGESLIDER_MAX_POINTS = 5000
+# Plotly markers lose their outline above this many points (an outlined marker is two primitives)
+_MARKER_EDGE_MAX_POINTS = 2000
+# Two-colour palettes resolved to RGBA once; plots index into them instead of passing colour names per point
+_SEASON_RGBA = to_rgba_array(['red', 'blue'])          # below / at-or-above the median month
+_PAYOUT_RGBA = to_rgba_array(['steelblue', 'orange'])  # untrended / detrended
+_RDBU = colormaps['RdBu']
+
+
+_FIGURE_CACHE: OrderedDict = OrderedDict()
+_FIGURE_CACHE_SIZE = 32
+
+
+_FIG_POOL: dict = {}
+
+
+def _get_fig(key: str, figsize: tuple):
+    """Pooled (fig, ax) for a plot kind: created once, then cleared and reused on later calls.
+
+    The returned figure is shared, so a previous result from the same plot function is overwritten
+    by the next call; save or render it before plotting again.
+    """
+    pooled = _FIG_POOL.get(key)
+    if pooled is None:
+        pooled = _FIG_POOL[key] = plt.subplots(figsize=figsize, layout='constrained')
+    else:
+        pooled[1].clear()
+    return pooled
+
+
+def _cache_key_part(arg):
+    """Hashable content key for a plot argument (frames, series, arrays and sequences by their data).
+
+    Raises TypeError for arguments that have no reliable content key.
+    """
+    if isinstance(arg, pd.DataFrame):
+        return (tuple(arg.columns), arg.shape,
+                pd.util.hash_pandas_object(arg, index=False).to_numpy().tobytes())
+    if isinstance(arg, (pd.Series, np.ndarray, list, tuple)):
+        arr = np.asarray(arg)
+        if arr.dtype.kind == 'O':  # raw bytes of an object array are pointers, not content
+            raise TypeError("object arrays are not cacheable")
+        return (arr.dtype.str, arr.shape, arr.tobytes())
+    hash(arg)
+    return arg
+
 
+def _cached_figure(fn):
+    """Memoize a figure builder on its inputs' contents (LRU); the cached figure is shared, not copied.
 
+    Calls whose arguments cannot be keyed fall through to an uncached build.
+    """
+    signature = inspect.signature(fn)
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        try:
+            key = (fn.__name__,) + tuple(_cache_key_part(v) for v in bound.arguments.values())
+        except TypeError:
+            return fn(*args, **kwargs)
+        fig = _FIGURE_CACHE.get(key)
+        if fig is None:
+            fig = _FIGURE_CACHE[key] = fn(*args, **kwargs)
+            if len(_FIGURE_CACHE) > _FIGURE_CACHE_SIZE:
+                _FIGURE_CACHE.popitem(last=False)
+        else:
+            _FIGURE_CACHE.move_to_end(key)
+        return fig
+    return wrapper
+
+
+def _interactive_figure(trace, x: np.ndarray, y: np.ndarray, color: np.ndarray):
+    """Figure holding one Scattergl trace; long series go through plotly-resampler (LTTB) if installed."""
+    if len(x) > _MAX_SHOWN_SAMPLES:
+        try:
+            from plotly_resampler import FigureResampler
+            from plotly_resampler.aggregation import MinMaxLTTB
+        except ImportError:
+            pass
+        else:
+            fig = FigureResampler(default_n_shown_samples=_MAX_SHOWN_SAMPLES,
+                                  default_downsampler=MinMaxLTTB())
+            fig.add_trace(trace, hf_x=x, hf_y=y, hf_marker_color=color)
+            return fig
+    trace.update(x=x, y=y, marker_color=color)
+    return go.Figure(trace)
+
+
+@_cached_figure
 def plot_annual_trend(df_yearly: pd.DataFrame):
     """Plot annual energy trend (matplotlib) -> fig."""
-    x = df_yearly['Year']; y = df_yearly['Energy_MWh_Hourly']
-    fig, ax = plt.subplots(figsize=(14, 6))
-    scatter = ax.scatter(x, y, c=y, cmap="RdBu", edgecolors="black", s=70)
-    ax.plot(x, y, '-o', color='gray')
+    x = df_yearly['Year'].to_numpy(); y = df_yearly['Energy_MWh_Hourly'].to_numpy()
+    fig, ax = plt.subplots(figsize=(14, 6), layout='constrained')
+    # Colours mapped once (in float32, plenty for a colormap) and handed over as RGBA;
+    # the colorbar gets its own mappable on the same norm
+    norm = Normalize(vmin=np.nanmin(y), vmax=np.nanmax(y))
+    rgba = _RDBU(norm(y.astype(np.float32, copy=False)))
+    # The scatter is the only marker artist; the gray line just connects it underneath
+    ax.scatter(x, y, c=rgba, edgecolors="black", s=70, zorder=2,
+               rasterized=len(x) > _RASTERIZE_MIN_POINTS)
+    ax.plot(x, y, '-', color='gray', zorder=1)
     ax.set_title('Annual Energy Trend')
     ax.set_xlabel('Year'); ax.set_ylabel('Energy (MWh)')
     ax.grid(True, linestyle='--', alpha=0.5)
-    fig.colorbar(scatter, ax=ax, label="MWh")
-    fig.tight_layout()
+    fig.colorbar(ScalarMappable(norm=norm, cmap=_RDBU), ax=ax, label="MWh")
     return fig
 
 
 def plot_monthly_scatter(df_monthly: pd.DataFrame):
     """Interactive monthly scatter (plotly) -> fig."""
-    fig = go.Figure(go.Scatter(
-        x=df_monthly['Date'],
-        y=df_monthly['Monthly_Energy_MWh'],
+    energy = df_monthly['Monthly_Energy_MWh'].to_numpy()
+    trace = go.Scattergl(
         mode='markers',
-        marker=dict(
-            size=8, color=df_monthly['Monthly_Energy_MWh'],
-            colorscale='RdBu', line=dict(width=0.5, color='black'))
-    ))
+        marker=dict(size=8, colorscale='RdBu',
+                    line=dict(width=0.5 if len(energy) < _MARKER_EDGE_MAX_POINTS else 0, color='black'))
+    )
+    fig = _interactive_figure(trace, df_monthly['Date'].to_numpy(), energy, energy.astype(np.float32, copy=False))
     fig.update_layout(
         title='Monthly Solar Energy Production',
-        xaxis=dict(title='Date', rangeslider=dict(visible=True)),
+        xaxis=dict(title='Date', rangeslider=dict(visible=len(energy) <= _RANGESLIDER_MAX_POINTS)),
         yaxis_title='Energy (MWh)',
         template='plotly_white'
     )
+    if len(energy) > _RANGESLIDER_MAX_POINTS:
+        fig.update_xaxes(rangeselector=dict(buttons=[dict(step='year', count=1, label='1y'),
+                                                     dict(step='all')]))
     return fig
 
 
 def plot_interactive_annual(df_yearly: pd.DataFrame):
     """Interactive annual lines+markers (plotly) -> fig."""
-    fig = go.Figure(go.Scatter(
-        x=df_yearly['Year'],
-        y=df_yearly['Energy_MWh_Hourly'],
+    energy = df_yearly['Energy_MWh_Hourly'].to_numpy()
+    trace = go.Scattergl(
         mode='lines+markers',
-        marker=dict(size=10, color=df_yearly['Energy_MWh_Hourly'],
-                    colorscale='RdBu', colorbar=dict(title='MWh'),
-                    line=dict(width=1, color='black'))
-    ))
+        marker=dict(size=10, colorscale='RdBu', colorbar=dict(title='MWh'),
+                    line=dict(width=1 if len(energy) < _MARKER_EDGE_MAX_POINTS else 0, color='black'))
+    )
+    fig = _interactive_figure(trace, df_yearly['Year'].to_numpy(), energy, energy.astype(np.float32, copy=False))
     fig.update_layout(
         title='Interactive Annual Solar Energy Production',
-        xaxis=dict(title='Year', rangeslider=dict(visible=True)),
+        xaxis=dict(title='Year', rangeslider=dict(visible=len(energy) <= _RANGESLIDER_MAX_POINTS)),
         yaxis_title='Energy (MWh)',
         template='plotly_white'
     )
     return fig
 
 
+@_cached_figure
 def plot_monthly_seasonality(df_monthly: pd.DataFrame):
     """Monthly seasonality (matplotlib) -> fig."""
-    df = df_monthly.copy()
-    df['Year'] = df['Date'].dt.year; df['Month'] = df['Date'].dt.month
-    monthly_avg = df.groupby('Month')['Monthly_Energy_MWh'].mean()
-    high_thresh = monthly_avg.median()
-    colors = ['blue' if v >= high_thresh else 'red' for v in monthly_avg]
-
-    fig, ax = plt.subplots(figsize=(10, 5))
-    ax.scatter(monthly_avg.index, monthly_avg.values, s=180, c=colors, edgecolor='black', zorder=3)
-    ax.plot(monthly_avg.index, monthly_avg.values, color='gray', linewidth=2.5, zorder=1)
+    dates = df_monthly['Date']
+    energy = df_monthly['Monthly_Energy_MWh'].to_numpy(dtype=np.float64)
+    known = dates.notna().to_numpy()
+    months = dates.dt.month.to_numpy()[known].astype(np.intp) - 1
+    energy = energy[known]
+    # Month averages by direct 12-bucket counting; NaN energies are skipped like a pandas mean
+    present = np.bincount(months, minlength=12) > 0
+    finite = ~np.isnan(energy)
+    if not finite.all():
+        months, energy = months[finite], energy[finite]
+    sums = np.bincount(months, weights=energy, minlength=12)
+    cnts = np.bincount(months, minlength=12)
+    month_idx = np.arange(1, 13)[present]
+    with np.errstate(invalid='ignore'):
+        avg = sums[present] / cnts[present]
+    colors = _SEASON_RGBA[(avg >= np.nanmedian(avg)).astype(np.intp)]
+
+    fig, ax = plt.subplots(figsize=(10, 5), layout='constrained')
+    ax.scatter(month_idx, avg, s=180, c=colors, edgecolor='black', zorder=3)
+    ax.plot(month_idx, avg, color='gray', linewidth=2.5, zorder=1)
     ax.set_xticks(range(1, 13))
     ax.set_xticklabels(['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec'])
     ax.set_title('Average Monthly Solar Energy Generation', fontsize=14, weight='bold')
     ax.set_xlabel('Month'); ax.set_ylabel('Avg Energy (MWh)')
     ax.grid(True, linestyle='--', alpha=0.4)
-    fig.tight_layout()
     return fig
 
 
 def plot_detrended_comparison(sub: pd.DataFrame):
     """Compare rescaled vs detrended series with trend lines (matplotlib) -> fig."""
-    fig, ax = plt.subplots(figsize=(12, 5))
-    ax.plot(sub['Year'], sub['Rescaled_Energy_MWh'], label='Rescaled Energy', color='blue', marker='o')
-    ax.plot(sub['Year'], sub['User_Detrended'], label='Detrended', color='green', marker='s')
+    x = sub['Year'].to_numpy(dtype=np.float64)
+    series = sub[['Rescaled_Energy_MWh', 'User_Detrended']].to_numpy(dtype=np.float64)
+    fig, ax = _get_fig('detrended_comparison', (12, 5))
+    ax.plot(x, series[:, 0], label='Rescaled Energy', color='blue', marker='o')
+    ax.plot(x, series[:, 1], label='Detrended', color='green', marker='s')
 
-    res_slope, res_int, *_ = linregress(sub['Year'], sub['Rescaled_Energy_MWh'])
-    det_slope, det_int, *_ = linregress(sub['Year'], sub['User_Detrended'])
-    ax.plot(sub['Year'], res_int + res_slope * sub['Year'], '--', color='navy', label='Rescaled Trend')
-    ax.plot(sub['Year'], det_int + det_slope * sub['Year'], '--', color='green', label='Detrended Trend')
+    # Both trend lines from one least-squares fit over the stacked series
+    slopes, intercepts = np.polyfit(x, series, 1)
+    trends = np.outer(x, slopes) + intercepts
+    ax.plot(x, trends[:, 0], '--', color='navy', label='Rescaled Trend')
+    ax.plot(x, trends[:, 1], '--', color='green', label='Detrended Trend')
 
     ax.set_title('Rescaled vs Detrended Energy Comparison')
     ax.set_xlabel('Year'); ax.set_ylabel('Energy (MWh)')
     ax.legend(); ax.grid(True, linestyle='--', alpha=0.5)
-    fig.tight_layout()
     return fig
 
 
 def plot_payout_bars(sub: pd.DataFrame):
     """Side-by-side bars for untrended vs detrended payouts (matplotlib) -> fig."""
-    fig, ax = plt.subplots(figsize=(12, 5))
+    fig, ax = _get_fig('payout_bars', (12, 5))
     bar_width = 0.4; idx = np.arange(len(sub))
-    ax.bar(idx, sub['Payout_Untrended'], width=bar_width, label='Untrended Payout', color='steelblue')
-    ax.bar(idx + bar_width, sub['Payout_Detrended'], width=bar_width, label='Detrended Payout', color='orange')
+    # All 2N bars as one PolyCollection: (left, right) x (0, height) rectangles, untrended first
+    left = np.concatenate([idx, idx + bar_width]) - bar_width / 2
+    height = np.concatenate([sub['Payout_Untrended'].to_numpy(dtype=np.float64),
+                             sub['Payout_Detrended'].to_numpy(dtype=np.float64)])
+    verts = np.zeros((left.size, 4, 2))
+    verts[:, :, 0] = left[:, None] + np.array([0.0, 0.0, bar_width, bar_width])
+    verts[:, 1:3, 1] = height[:, None]
+    colors = np.repeat(_PAYOUT_RGBA, len(sub), axis=0)
+    bars = PolyCollection(verts, facecolors=colors, edgecolors='none',
+                          rasterized=left.size > _RASTERIZE_MIN_POINTS)
+    bars.sticky_edges.y.append(0)  # no margin below the baseline, as with ax.bar
+    ax.add_collection(bars)
+    ax.autoscale_view()
     ax.set_xticks(idx + bar_width / 2)
-    ax.set_xticklabels(sub['Year'], rotation=45)
+    ax.set_xticklabels(sub['Year'].to_numpy(), rotation=45)
     ax.set_xlabel('Year'); ax.set_ylabel('Payout (INR)')
     ax.set_title('Annual Payout: Untrended vs Detrended')
-    ax.legend(); ax.grid(True, linestyle='--', alpha=0.4)
-    fig.tight_layout()
+    ax.legend(handles=[Patch(color='steelblue', label='Untrended Payout'),
+                       Patch(color='orange', label='Detrended Payout')])
+    ax.grid(True, linestyle='--', alpha=0.4)
     return fig
 
 
+@_cached_figure
 def plot_gamma_distributions(percentiles: np.ndarray, empirical: np.ndarray,
                              gamma_vals: np.ndarray, blown_vals: np.ndarray,
                              strike: float, exit: float):
     """Empirical vs gamma vs blown gamma distributions -> fig."""
-    fig, ax = plt.subplots(figsize=(10, 6))
+    rasterized = len(percentiles) > _RASTERIZE_MIN_POINTS
+    fig, ax = plt.subplots(figsize=(10, 6), layout='constrained')
     ax.plot(empirical, percentiles, label='Empirical', color='C0', linewidth=2,
-            marker='o', markerfacecolor='C1', markersize=4)
-    ax.plot(gamma_vals, percentiles, label='Gamma Model', color='green', linestyle='--', linewidth=2)
-    ax.plot(blown_vals, percentiles, label='Blown Gamma', color='red', linestyle=':', linewidth=2)
-    ax.axvline(x=strike, color='black', linestyle='--', linewidth=1.5, label='Strike')
-    ax.axvline(x=exit, color='gray', linestyle='--', linewidth=1.5, label='Exit')
+            marker='o', markerfacecolor='C1', markersize=4, rasterized=rasterized)
+    # Model curves share one collection; strike/exit span the axes height in one more
+    ax.add_collection(LineCollection(
+        [np.column_stack([gamma_vals, percentiles]), np.column_stack([blown_vals, percentiles])],
+        colors=['green', 'red'], linestyles=['--', ':'], linewidths=2, rasterized=rasterized))
+    ax.add_collection(LineCollection(
+        [[(strike, 0), (strike, 1)], [(exit, 0), (exit, 1)]], transform=ax.get_xaxis_transform(),
+        colors=['black', 'gray'], linestyles='--', linewidths=1.5))
+    ax.autoscale_view()
     ax.set_xlabel('Energy (MWh)'); ax.set_ylabel('Percentile')
     ax.set_title('Energy Distribution Comparison')
-    ax.legend(); ax.grid(True, linestyle='--', alpha=0.5)
-    fig.tight_layout()
+    handles = ax.get_legend_handles_labels()[0] + [
+        Line2D([], [], color='green', linestyle='--', linewidth=2, label='Gamma Model'),
+        Line2D([], [], color='red', linestyle=':', linewidth=2, label='Blown Gamma'),
+        Line2D([], [], color='black', linestyle='--', linewidth=1.5, label='Strike'),
+        Line2D([], [], color='gray', linestyle='--', linewidth=1.5, label='Exit'),
+    ]
+    ax.legend(handles=handles); ax.grid(True, linestyle='--', alpha=0.5)
     return fig
 
 
+@njit(cache=True, parallel=True)
+def _uniform_hist(vals, edges, n_chunks):
+    """Counts of vals over uniform edges (last bin closed), matching np.histogram.
+
+    Expects finite vals and finite, increasing edges; the caller filters and sizes both.
+    """
+    nbins = edges.size - 1
+    lo = edges[0]
+    hi = edges[nbins]
+    scale = nbins / (hi - lo)
+    n = vals.size
+    step = (n + n_chunks - 1) // n_chunks
+    local = np.zeros((n_chunks, nbins), dtype=np.int64)
+    # Each chunk counts into its own row, so no two threads share a bin
+    for c in prange(n_chunks):
+        for i in range(c * step, min(n, (c + 1) * step)):
+            v = vals[i]
+            if not (lo <= v <= hi):
+                continue
+            b = min(int((v - lo) * scale), nbins - 1)
+            # Nudge rounding at the edges so bins agree with a searchsorted assignment
+            if b > 0 and v < edges[b]:
+                b -= 1
+            elif b < nbins - 1 and v >= edges[b + 1]:
+                b += 1
+            local[c, b] += 1
+    counts = np.zeros(nbins, dtype=np.int64)
+    for c in range(n_chunks):
+        counts += local[c]
+    return counts
+
+
 def plot_sobol_simulation(simulated_values: np.ndarray):
     """Histogram of blown Sobol simulation values (matplotlib) -> fig."""
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.hist(simulated_values, bins=40, color='purple', alpha=0.7, edgecolor='black')
+    values = np.ascontiguousarray(simulated_values, dtype=np.float64).reshape(-1)
+    # Range from the finite samples only; no samples gives np.histogram's default 0-1 range
+    finite = np.isfinite(values)
+    if finite.any():
+        lo, hi = values[finite].min(), values[finite].max()
+    else:
+        lo, hi = 0.0, 1.0
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5  # same widening np.histogram applies to a degenerate range
+    edges = np.linspace(lo, hi, 41)
+    counts = _uniform_hist(values[finite] if not finite.all() else values, edges, get_num_threads())
+    fig, ax = _get_fig('sobol_simulation', (10, 6))
+    # One StepPatch for the whole histogram instead of a Rectangle per bin
+    ax.stairs(counts, edges, fill=True, color='purple', alpha=0.7, edgecolor='black', linewidth=0.5)
     ax.set_title('Sobol Simulation Results Distribution')
     ax.set_xlabel('Simulated Energy (MWh)'); ax.set_ylabel('Frequency')
     ax.grid(True, linestyle='--', alpha=0.5)
-    fig.tight_layout()
     return fig
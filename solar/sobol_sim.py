@@ -1,8 +1,31 @@
 """Sobol-based stochastic sampling of gamma-distributed energy values (from CSV file)."""
 from __future__ import annotations
+import os
+from functools import lru_cache
 import numpy as np
-import pandas as pd
-from scipy.stats import gamma as sgamma
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+from scipy.special import gammaincinv
+
+
+@lru_cache(maxsize=4)
+def _load_sobol_numbers(csv_path: str, mtime: float) -> np.ndarray:
+    """Validated Sobol numbers from the first CSV column (cached per path and modification time)."""
+    table = pv.read_csv(csv_path)
+    if table.num_columns == 0:
+        raise ValueError("Sobol CSV is empty or has no columns.")
+    sobol_numbers = pc.drop_null(table.column(0)).to_numpy().astype(np.float64)
+    if sobol_numbers.size and not (sobol_numbers.min() >= 0 and sobol_numbers.max() <= 1):
+        raise ValueError("Sobol CSV must contain values between 0 and 1.")
+    sobol_numbers.flags.writeable = False
+    return sobol_numbers
+
+@lru_cache(maxsize=32)
+def _unit_gamma_table(csv_path: str, mtime: float, shape: float) -> np.ndarray:
+    """Gamma(shape, scale=1) quantiles of the Sobol numbers; any scale is a single multiply away."""
+    table = gammaincinv(shape, _load_sobol_numbers(csv_path, mtime))
+    table.flags.writeable = False
+    return table
 
 def sobol_sim(shape: float, scale: float, csv_path: str) -> np.ndarray:
     """
@@ -16,10 +39,5 @@ def sobol_sim(shape: float, scale: float, csv_path: str) -> np.ndarray:
     Returns:
         np.ndarray: Gamma-distributed values corresponding to Sobol numbers.
     """
-    sobol_df = pd.read_csv(csv_path)
-    if sobol_df.shape[1] == 0:
-        raise ValueError("Sobol CSV is empty or has no columns.")
-    sobol_numbers = sobol_df.iloc[:, 0].dropna().astype(float).values
-    if not ((sobol_numbers >= 0) & (sobol_numbers <= 1)).all():
-        raise ValueError("Sobol CSV must contain values between 0 and 1.")
-    return sgamma.ppf(sobol_numbers, a=shape, scale=scale)
\ No newline at end of file
+    table = _unit_gamma_table(str(csv_path), os.path.getmtime(csv_path), float(shape))
+    return table * scale
\ No newline at end of file
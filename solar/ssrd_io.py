@@ -67,7 +67,9 @@ def extract_ssrd_from_nc(
         unit_str = "J m-2"
 
     # Build DataFrame
-    time = pd.to_datetime(da["time"].values)
+    time = da["time"].values
+    if time.dtype.kind != "M":
+        time = pd.to_datetime(time)
     if tz:
         time = (pd.DatetimeIndex(time)
                 .tz_localize("UTC")
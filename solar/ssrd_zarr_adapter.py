@@ -1,11 +1,114 @@
-# ssrd_zarr_adapter.py
+# ssrd_zarr_adapter.py  (needs zarr-python >= 3: pip install "solar-model[zarr]")
 from __future__ import annotations
+import base64
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from functools import lru_cache
 from typing import Tuple, Dict, Optional
 import numpy as np
 import pandas as pd
-import xarray as xr
+import zarr
+from xarray.coding.times import decode_cf_datetime
+
+_SSRD_NAMES = ("ssrd", "surface_solar_radiation_downwards")
+# J m-2 -> unit, as float32 reciprocals so conversion is one SIMD multiply
+_UNIT_SCALE = {"Wm2": np.float32(1.0 / 3600.0), "kWhm2": np.float32(1.0 / 3_600_000.0)}
+
+
+def _open_root(zarr_path: str) -> zarr.Group:
+    """Open the store read-only from consolidated metadata, falling back to a key listing."""
+    try:
+        return zarr.open_consolidated(zarr_path, mode="r")
+    except (KeyError, ValueError):
+        return zarr.open_group(zarr_path, mode="r")
+
+
+def _array_dims(arr: zarr.Array) -> Tuple[str, ...]:
+    """Dimension names as written by xarray (v2 attribute or v3 metadata)."""
+    dims = arr.attrs.get("_ARRAY_DIMENSIONS") or getattr(arr.metadata, "dimension_names", None)
+    if not dims:
+        raise ValueError(f"Zarr array {arr.name!r} has no dimension names.")
+    return tuple(dims)
+
+
+def _fill_value(arr: zarr.Array):
+    """CF _FillValue as xarray would read it."""
+    if arr.metadata.zarr_format == 2:
+        return arr.fill_value
+    fill = arr.attrs.get("_FillValue")
+    if isinstance(fill, str):
+        # zarr v3 stores float fills base64-encoded, as little-endian float64 regardless of the
+        # array dtype (xarray's FillValueCoder); read at the payload's own width, then cast
+        payload = base64.b64decode(fill)
+        fill = arr.dtype.type(np.frombuffer(payload, dtype=f"<f{len(payload)}")[0])
+    return fill
+
+
+def _load_time(arr: zarr.Array) -> np.ndarray:
+    """Read and CF-decode a time coordinate to datetime64."""
+    raw = arr[:]
+    units = arr.attrs.get("units")
+    if units is None:
+        decoded = raw
+    else:
+        decoded = decode_cf_datetime(raw, units, arr.attrs.get("calendar", "standard"))
+    # Already datetime64 in the common case: a dtype cast avoids pandas' parsing path
+    if decoded.dtype.kind == "M":
+        return decoded.astype("datetime64[ns]", copy=False)
+    return pd.to_datetime(decoded).to_numpy()
+
+
+def _decode_values(raw: np.ndarray, encoding: Dict) -> np.ndarray:
+    """Apply CF _FillValue / scale_factor / add_offset decoding to raw Zarr values."""
+    fill = encoding.get("_FillValue")
+    scale = encoding.get("scale_factor")
+    offset = encoding.get("add_offset")
+    if scale is None and offset is None:
+        if fill is not None and raw.dtype.kind == "f" and not np.isnan(fill):
+            raw = np.where(raw == fill, np.nan, raw)
+        return raw
+    v = raw.astype(np.float64)
+    if fill is not None:
+        v[raw == fill] = np.nan
+    if scale is not None:
+        v *= scale
+    if offset is not None:
+        v += offset
+    return v
+
+
+def _axis_lookup(vals: np.ndarray) -> Tuple:
+    """Precompute a nearest-neighbour lookup: (origin, step) for a uniform grid, else a sort order."""
+    n = vals.size
+    if n > 1:
+        step = (float(vals[-1]) - float(vals[0])) / (n - 1)
+        if step != 0 and np.allclose(np.diff(vals), step, rtol=1e-6, atol=0.0):
+            return float(vals[0]), step, None, None
+    order = np.argsort(vals, kind="stable")
+    return None, None, order, vals[order]
+
+
+def _nearest(vals: np.ndarray, lookup: Tuple, x: float) -> int:
+    """Index of the value closest to x (first one on ties), checking at most three neighbours."""
+    origin, step, order, sorted_vals = lookup
+    n = vals.size
+    if step is not None:
+        i = min(max(int(round((x - origin) / step)), 0), n - 1)
+        cands = range(max(i - 1, 0), min(i + 2, n))
+    else:
+        pos = int(np.searchsorted(sorted_vals, x))
+        cands = sorted(int(order[j]) for j in range(max(pos - 1, 0), min(pos + 1, n)))
+    return min(cands, key=lambda j: abs(vals[j] - x))
+
+
+@lru_cache(maxsize=64)
+def _fixed_utc_offset(tz: str, t0: np.datetime64, t1: np.datetime64) -> Optional[np.timedelta64]:
+    """UTC offset of `tz` if it is constant over [t0, t1] (checked daily), else None (e.g. DST)."""
+    days = pd.date_range(t0, t1, freq="D").append(pd.DatetimeIndex([t1]))
+    local = days.tz_localize("UTC").tz_convert(tz).tz_localize(None)
+    offsets = (local - days).to_numpy()
+    return offsets[0] if (offsets == offsets[0]).all() else None
+
 
 class SSRDStore:
     """
@@ -14,30 +117,55 @@ class SSRDStore:
     """
     def __init__(self, zarr_path: str | Path):
         self.zarr_path = str(zarr_path)
-        self.ds = xr.open_zarr(self.zarr_path, consolidated=True)
-        self.var = "ssrd" if "ssrd" in self.ds.data_vars else (
-            "surface_solar_radiation_downwards" if "surface_solar_radiation_downwards" in self.ds.data_vars
-            else list(self.ds.data_vars)[0]
-        )
-        self.lats = self.ds["latitude"].values
-        self.lons = self.ds["longitude"].values
+        root = _open_root(self.zarr_path)
+        names = set(root.array_keys())
+        time_name = "time" if "time" in names else "valid_time"
+        coords = {"latitude", "longitude", time_name}
+        if not coords <= names:
+            raise ValueError(f"Zarr store must contain {sorted(coords)} coordinates.")
+        self.var = next((n for n in _SSRD_NAMES if n in names), None) or sorted(names - coords)[0]
+
+        # Coordinate reads and the SSRD array's metadata lookup are independent round-trips
+        # (one per array on non-consolidated or remote stores), so issue them all at once
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            lats = pool.submit(lambda: root["latitude"][:])
+            lons = pool.submit(lambda: root["longitude"][:])
+            time = pool.submit(lambda: _load_time(root[time_name]))
+            z = pool.submit(lambda: root[self.var])
+        self.lats = lats.result()
+        self.lons = lons.result()
+        self._lat_lookup = _axis_lookup(self.lats)
+        self._lon_lookup = _axis_lookup(self.lons)
+
+        # Keep the raw zarr array and decoded time axis so per-site reads are a single chunk fetch
+        self._z = z.result()
+        attrs = self._z.attrs
+        self._encoding = {
+            "_FillValue": _fill_value(self._z),
+            "scale_factor": attrs.get("scale_factor"),
+            "add_offset": attrs.get("add_offset"),
+        }
+        dims = _array_dims(self._z)
+        self._lat_axis = dims.index("latitude")
+        self._lon_axis = dims.index("longitude")
+        self._time = time.result()
+        self._time.flags.writeable = False
 
     def _nearest_index(self, lat: float, lon: float) -> Tuple[int, int]:
-        ilat = int(np.abs(self.lats - lat).argmin())
-        ilon = int(np.abs(self.lons - lon).argmin())
-        return ilat, ilon
+        # If longitudes are 0..360 and a negative lon is passed, wrap it (as the NetCDF reader does)
+        if lon < 0 and self.lons.min() >= 0:
+            lon = lon + 360.0
+        return _nearest(self.lats, self._lat_lookup, lat), _nearest(self.lons, self._lon_lookup, lon)
 
     @lru_cache(maxsize=4096)
-    def _series_at_index(self, ilat: int, ilon: int, unit: str) -> Tuple[np.ndarray, np.ndarray]:
-        """Return (time_npdatetime64, values) for a grid index and unit."""
-        da = self.ds[self.var].isel(latitude=ilat, longitude=ilon)
-        if unit == "Wm2":
-            da = da / 3600.0
-        elif unit == "kWhm2":
-            da = da / 3_600_000.0
-        t = pd.to_datetime(da["time"].values).to_numpy()
-        v = da.values
-        return t, v
+    def _series_at_index(self, ilat: int, ilon: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (time_npdatetime64, float32 values in J m-2) for a grid index; shared across units."""
+        idx = [slice(None)] * self._z.ndim
+        idx[self._lat_axis] = ilat
+        idx[self._lon_axis] = ilon
+        v = _decode_values(self._z[tuple(idx)], self._encoding).astype(np.float32, copy=False)
+        v.flags.writeable = False
+        return self._time, v
 
     def get_dataframe(
         self,
@@ -55,7 +183,7 @@ class SSRDStore:
         - start/end: optional ISO date strings to clip (e.g., "2005-01-01")
         """
         ilat, ilon = self._nearest_index(lat, lon)
-        t, v = self._series_at_index(ilat, ilon, unit)
+        t, v = self._series_at_index(ilat, ilon)
 
         # Optional time clip (do before tz shift)
         if start or end:
@@ -64,15 +192,47 @@ class SSRDStore:
             mask = (t >= t0) & (t <= t1)
             t, v = t[mask], v[mask]
 
+        # Unit conversion; the cache only holds J m-2, so scale in place only on a clipped copy
+        scale = _UNIT_SCALE.get(unit)
+        if scale is not None:
+            v = np.multiply(v, scale, out=v if v.flags.writeable else None)
+
         # Optional timezone shift (UTC -> local, then drop tz)
-        if tz:
-            t = (pd.DatetimeIndex(t).tz_localize("UTC").tz_convert(tz).tz_localize(None)).to_numpy()
+        if tz and t.size:
+            offset = _fixed_utc_offset(tz, t[0], t[-1])
+            if offset is not None:
+                # Fixed-offset zone (e.g. Asia/Kolkata): a single vector add, kept in the array's unit
+                t = t + offset.astype(t.dtype.str.replace("M", "m"))
+            else:
+                t = (pd.DatetimeIndex(t).tz_localize("UTC").tz_convert(tz).tz_localize(None)).to_numpy()
 
-        df = pd.DataFrame({"Date": pd.to_datetime(t), "SSRD": v})
+        # Arrays are already datetime64 / float: hand them over as-is, copying only the
+        # read-only cached ones so callers can still edit the frame in place
+        if not t.flags.writeable:
+            t = t.copy()
+        if not v.flags.writeable:
+            v = v.copy()
+        df = pd.DataFrame({"Date": t, "SSRD": v}, copy=False)
         meta = {"lat": float(self.lats[ilat]), "lon": float(self.lons[ilon]), "unit": unit, "rows": int(len(df))}
         return df, meta
 
 
+def nc_to_zarr(nc_path: str | Path, zarr_path: str | Path) -> Path:
+    """
+    One-off conversion of an ERA5 SSRD NetCDF file into a consolidated Zarr store
+    chunked as (time=744, lat=1, lon=1), the layout SSRDStore is tuned for.
+    """
+    import xarray as xr
+    from solar.ssrd_io import _find_var, _normalize_time
+
+    ds = _normalize_time(xr.open_dataset(nc_path))
+    var = _find_var(ds)
+    chunks = tuple({"time": min(744, ds.sizes["time"])}.get(d, 1) for d in ds[var].dims)
+    ds[[var]].to_zarr(zarr_path, mode="w", consolidated=True, zarr_format=2,
+                      encoding={var: {"chunks": chunks}})
+    return Path(zarr_path)
+
+
 # -------- Convenience one-liner for your pipeline --------
 _GLOBAL_STORE: SSRDStore | None = None
 